@@ -1,14 +1,27 @@
 ﻿import os
 import sys
 import time
-import msvcrt
-from tkinter import Tk, filedialog
-from PIL import Image
-
-
-def set_window_title(title):
-    if os.name == "nt":
-        os.system(f"title {title}")
+from converter_core import (
+    MAX_BAND_BYTES,
+    band_rows,
+    display_progress,
+    get_hardlink_choice,
+    get_user_choice,
+    iter_rgb_bands,
+    load_filedialog,
+    process_folder,
+    remap_band,
+    require_pillow,
+    set_window_title,
+    wait_for_key,
+)
+
+
+BAND_BYTES_PER_PIXEL = 10
+HISTOGRAM_MASK = 0xF8
+HISTOGRAM_BIN_CENTER = 0x04
+HISTOGRAM_COLORS = 32 * 32 * 32
+HISTOGRAM_SAMPLE_PIXELS = 1024 * 1024
 
 
 def display_welcome():
@@ -29,96 +42,85 @@ def display_welcome():
     print("[Q] Quit\n")
 
 
-def get_user_choice():
-    while True:
-        choice = input("Your choice: ").strip().upper()
-        if choice in ["1", "2", "Q"]:
-            return choice
-        print("Invalid choice. Please enter 1, 2, or Q.")
-
-
-def convert_to_8bit(input_path, output_path):
-    try:
-        img = Image.open(input_path).convert("P", palette=Image.ADAPTIVE, colors=256)
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        img.save(output_path)
-        return True, None
-    except Exception as e:
-        return False, str(e)
-
-
-def process_folder(folder_path, output_root, progress_callback=None):
-    converted_files = []
-    error_messages = []
-
-    parent_folder_name = os.path.basename(os.path.normpath(folder_path))
-
-    total_files = 0
-    for root, _, files in os.walk(folder_path):
-        for file in files:
-            if file.lower().endswith(".png"):
-                total_files += 1
-
-    processed_files = 0
-    start_time = time.time()
-
-    for root, _, files in os.walk(folder_path):
-        for file in files:
-            if file.lower().endswith(".png"):
-                full_path = os.path.join(root, file)
-
-                relative_path = os.path.relpath(full_path, start=folder_path)
-                relative_dir = os.path.dirname(relative_path)
+def build_global_palette(img, rows):
+    from PIL import Image
+
+    exact_colors = set()
+    for _, band in iter_rgb_bands(img, rows):
+        band_colors = band.getcolors(256)
+        del band
+        if band_colors is None:
+            break
+        exact_colors.update(color for _, color in band_colors)
+        if len(exact_colors) > 256:
+            break
+    else:
+        return sorted(exact_colors), None
+
+    histogram = {}
+    for _, band in iter_rgb_bands(img, rows):
+        reduced = band.point(
+            lambda value: (value & HISTOGRAM_MASK) | HISTOGRAM_BIN_CENTER
+        )
+        for count, color in reduced.getcolors(HISTOGRAM_COLORS):
+            histogram[color] = histogram.get(color, 0) + count
+        del band, reduced
+
+    total = sum(histogram.values())
+    scale = min(1.0, HISTOGRAM_SAMPLE_PIXELS / total)
+    sample = b"".join(
+        bytes(color) * max(1, round(count * scale))
+        for color, count in histogram.items()
+    )
+    sample_image = Image.frombytes("RGB", (len(sample) // 3, 1), sample)
+    return None, sample_image.convert("P", palette=Image.ADAPTIVE, colors=256)
 
-                output_dir = os.path.join(output_root, parent_folder_name, relative_dir)
-                output_filename = file
-                output_path = os.path.join(output_dir, output_filename)
 
-                success, message = convert_to_8bit(full_path, output_path)
-                if success:
-                    converted_files.append(output_path)
-                else:
-                    error_messages.append(f"Error in {relative_path}: {message}")
-
-                processed_files += 1
-                if progress_callback:
-                    elapsed_time = time.time() - start_time
-                    progress = processed_files / total_files
-                    remaining_time = (
-                        (elapsed_time / processed_files)
-                        * (total_files - processed_files)
-                        if processed_files > 0
-                        else 0
-                    )
-                    progress_callback(
-                        processed_files, total_files, progress, remaining_time
-                    )
+def convert_to_8bit_tiled(img, max_band_bytes=MAX_BAND_BYTES):
+    from PIL import Image
 
-    return converted_files, error_messages
+    width, height = img.size
+    rows = band_rows(width, height, BAND_BYTES_PER_PIXEL, max_band_bytes)
+    exact_colors, palette_image = build_global_palette(img, rows)
 
+    output_image = Image.new("P", img.size)
+    if exact_colors is not None:
+        color_to_index = {bytes(color): i for i, color in enumerate(exact_colors)}
+        output_image.putpalette(b"".join(bytes(color) for color in exact_colors))
+    else:
+        output_image.putpalette(palette_image.getpalette())
 
-def display_progress(current, total, progress, remaining_time):
-    bar_length = 40
-    filled_length = int(bar_length * progress)
-    bar = "█" * filled_length + "-" * (bar_length - filled_length)
+    for top, band in iter_rgb_bands(img, rows):
+        if exact_colors is not None:
+            band = Image.frombytes("P", band.size, remap_band(band, color_to_index))
+        else:
+            band = band.quantize(palette=palette_image, dither=Image.NONE)
+        output_image.paste(band, (0, top))
+        del band
 
-    mins, secs = divmod(int(remaining_time), 60)
-    time_estimate = f"{mins:02d}:{secs:02d}" if remaining_time > 0 else "--:--"
+    return output_image
 
-    sys.stdout.write(f"\rConverting: [{bar}] {current}/{total} ({progress:.1%})")
-    sys.stdout.write(f"\nETA: {time_estimate}\033")
-    sys.stdout.flush()
 
+def convert_to_8bit(input_path, output_path, max_band_bytes=MAX_BAND_BYTES):
+    from PIL import Image
 
-def wait_for_key():
-    print("\nPress any key to exit...")
-    msvcrt.getch()
+    try:
+        img = Image.open(input_path)
+        width, height = img.size
+        has_alpha = "A" in img.getbands() or "transparency" in img.info
+        if width * height * 4 > max_band_bytes and not has_alpha:
+            img = convert_to_8bit_tiled(img, max_band_bytes)
+        else:
+            img = img.convert("P", palette=Image.ADAPTIVE, colors=256)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        img.save(output_path)
+        return True, None
+    except Exception as e:
+        return False, str(e)
 
 
 def main():
     set_window_title("256COLORS Converter - Made by Rafaelmorai")
-    root = Tk()
-    root.withdraw()
 
     output_root = os.path.join(os.path.expanduser("~"), "Downloads", "256COLORS_Output")
 
@@ -129,7 +131,10 @@ def main():
         print("\nGoodbye!")
         return
 
+    filedialog = load_filedialog()
+
     total_converted = 0
+    total_reused = 0
     all_error_messages = []
 
     if choice == "1":
@@ -177,16 +182,32 @@ def main():
             print("\nNo folder selected. Exiting.")
             return
 
+        use_hardlinks = get_hardlink_choice()
+
         print(f"\nProcessing folder: {current_folder}")
-        converted, errors = process_folder(
-            current_folder, output_root, display_progress
+        converted, errors, reused = process_folder(
+            current_folder,
+            output_root,
+            ".png",
+            None,
+            convert_to_8bit,
+            display_progress,
+            use_hardlinks,
         )
         total_converted += len(converted)
+        total_reused += reused
         all_error_messages.extend(errors)
         print("\n")
 
     summary = f"Conversion complete!\n\nTotal files converted: {total_converted}"
 
+    if total_reused:
+        summary += (
+            f"\nDuplicate files reused: {total_reused} "
+            f"({total_reused / (total_converted + len(all_error_messages)):.1%} "
+            "of conversions skipped)"
+        )
+
     if all_error_messages:
         summary += f"\n\nErrors encountered ({len(all_error_messages)}):\n" + "\n".join(
             all_error_messages[:5]
@@ -200,13 +221,7 @@ def main():
 
 
 if __name__ == "__main__":
-    try:
-        from PIL import Image
-    except ImportError:
-        print("Error: PIL (Pillow) module not installed. Please install it with:")
-        print("pip install pillow")
-        wait_for_key()
-        sys.exit(1)
+    require_pillow("pip install pillow")
 
     try:
         main()
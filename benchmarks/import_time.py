@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["converter_core", "png2xyz", "xyz2png", "256colors"]
+LAZY_MODULES = ["PIL", "tkinter", "msvcrt"]
+IMPORT_TIME_BUDGET = 0.007
+RUNS = 11
+
+MEASURE_SCRIPT = """
+import importlib
+import sys
+import time
+
+start = time.perf_counter()
+importlib.import_module({module!r})
+print(time.perf_counter() - start)
+print(",".join(name for name in {lazy_modules!r} if name in sys.modules))
+"""
+
+
+def measure_import(module):
+    script = MEASURE_SCRIPT.format(module=module, lazy_modules=LAZY_MODULES)
+    timings = []
+    loaded = set()
+
+    for _ in range(RUNS):
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        elapsed, eager = result.stdout.splitlines()
+        timings.append(float(elapsed))
+        loaded.update(name for name in eager.split(",") if name)
+
+    return min(timings), sorted(loaded)
+
+
+def main():
+    failures = []
+
+    print(f"Import time budget: {IMPORT_TIME_BUDGET * 1000:.1f} ms (best of {RUNS})")
+    for module in MODULES:
+        elapsed, loaded = measure_import(module)
+        status = "OK"
+        if elapsed > IMPORT_TIME_BUDGET:
+            status = "OVER BUDGET"
+            failures.append(f"{module} took {elapsed * 1000:.1f} ms")
+        if loaded:
+            status = "EAGER IMPORT"
+            failures.append(f"{module} imported {', '.join(loaded)} at load time")
+        print(f"{module:<16} {elapsed * 1000:7.1f} ms  {status}")
+
+    if failures:
+        print("\nImport time regression:\n" + "\n".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
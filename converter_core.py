@@ -0,0 +1,269 @@
+import os
+import sys
+import time
+
+
+# Caps the working buffers of one band. The decoded source image, and the
+# 8-bit output image of 256colors, are not covered by it.
+MAX_BAND_BYTES = 64 * 1024 * 1024
+
+
+def set_window_title(title):
+    if os.name == "nt":
+        os.system(f"title {title}")
+
+
+def get_user_choice():
+    while True:
+        choice = input("Your choice: ").strip().upper()
+        if choice in ["1", "2", "Q"]:
+            return choice
+        print("Invalid choice. Please enter 1, 2, or Q.")
+
+
+def get_hardlink_choice():
+    while True:
+        choice = (
+            input("Hardlink duplicate files instead of copying them? [y/N]: ")
+            .strip()
+            .upper()
+        )
+        if choice in ["", "N"]:
+            return False
+        if choice == "Y":
+            return True
+        print("Invalid choice. Please enter Y or N.")
+
+
+def load_filedialog():
+    from tkinter import Tk, filedialog
+
+    root = Tk()
+    root.withdraw()
+    return filedialog
+
+
+def require_pillow(install_command):
+    import importlib.util
+
+    if importlib.util.find_spec("PIL") is None:
+        print("Error: PIL (Pillow) module not installed. Please install it with:")
+        print(install_command)
+        wait_for_key()
+        sys.exit(1)
+
+
+def band_rows(width, height, bytes_per_pixel, max_band_bytes=MAX_BAND_BYTES):
+    # A band never costs more than one byte per pixel of the whole image, which is
+    # what the single-shot conversion already spent on its index buffer.
+    band_bytes = min(max_band_bytes, width * height)
+    return max(1, band_bytes // max(1, width * bytes_per_pixel))
+
+
+def iter_rgb_bands(img, rows):
+    width, height = img.size
+    for top in range(0, height, rows):
+        band = img.crop((0, top, width, min(top + rows, height)))
+        if band.mode != "RGB":
+            band = band.convert("RGB")
+        yield top, band
+        del band
+
+
+def remap_band(band, color_to_index):
+    from PIL import Image
+
+    band_colors = band.getcolors(256)
+    indexed = band.convert("P", palette=Image.ADAPTIVE, colors=256)
+    indexed_colors = indexed.getcolors(256)
+    if band_colors is None or len(indexed_colors) != len(band_colors):
+        raise ValueError("Band has more than 256 colors")
+
+    band_palette = indexed.getpalette()
+    lookup = bytearray(256)
+    for _, index in indexed_colors:
+        color = bytes(band_palette[index * 3 : index * 3 + 3])
+        if color not in color_to_index:
+            raise ValueError(f"Color {tuple(color)} is missing from the palette")
+        lookup[index] = color_to_index[color]
+
+    return indexed.tobytes().translate(lookup)
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    import hashlib
+
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_duplicates(paths):
+    files_by_size = {}
+    payload_keys = {}
+
+    for path in paths:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            payload_keys[path] = path
+            continue
+        files_by_size.setdefault(size, []).append(path)
+
+    for size, same_size in files_by_size.items():
+        if len(same_size) == 1:
+            payload_keys[same_size[0]] = same_size[0]
+            continue
+
+        for path in same_size:
+            try:
+                payload_keys[path] = (size, file_digest(path))
+            except OSError:
+                payload_keys[path] = path
+
+    return payload_keys
+
+
+def detach_output(output_path):
+    # Converters write their output in place, so a hardlink left by an earlier
+    # run would carry the new image into every linked file.
+    try:
+        if os.stat(output_path).st_nlink > 1:
+            os.remove(output_path)
+    except OSError:
+        pass
+
+
+def copy_converted(source_path, output_path, use_hardlinks=False):
+    import shutil
+
+    try:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        if os.path.exists(output_path):
+            if os.path.samefile(source_path, output_path):
+                return True, None
+            os.remove(output_path)
+
+        if use_hardlinks:
+            try:
+                os.link(source_path, output_path)
+                return True, None
+            except OSError:
+                pass
+
+        shutil.copyfile(source_path, output_path)
+        return True, None
+
+    except Exception as e:
+        return False, str(e)
+
+
+def process_folder(
+    folder_path,
+    output_root,
+    input_extension,
+    output_extension,
+    convert_file,
+    progress_callback=None,
+    use_hardlinks=False,
+    max_band_bytes=MAX_BAND_BYTES,
+):
+    converted_files = []
+    error_messages = []
+    reused_files = 0
+
+    parent_folder_name = os.path.basename(os.path.normpath(folder_path))
+
+    input_files = []
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            if file.lower().endswith(input_extension):
+                input_files.append(os.path.join(root, file))
+
+    total_files = len(input_files)
+    payload_keys = find_duplicates(input_files)
+    converted_payloads = {}
+
+    processed_files = 0
+    start_time = time.time()
+
+    for full_path in input_files:
+        file = os.path.basename(full_path)
+
+        relative_path = os.path.relpath(full_path, start=folder_path)
+        relative_dir = os.path.dirname(relative_path)
+
+        output_dir = os.path.join(output_root, parent_folder_name, relative_dir)
+        if output_extension is None:
+            output_filename = file
+        else:
+            output_filename = os.path.splitext(file)[0] + output_extension
+        output_path = os.path.join(output_dir, output_filename)
+
+        payload_key = payload_keys[full_path]
+        if payload_key in converted_payloads:
+            first_output, first_path, success, message = converted_payloads[payload_key]
+            if success:
+                success, message = copy_converted(
+                    first_output, output_path, use_hardlinks
+                )
+                if success:
+                    reused_files += 1
+            else:
+                message = f"same content as {first_path}, which failed: {message}"
+        else:
+            detach_output(output_path)
+            success, message = convert_file(full_path, output_path, max_band_bytes)
+            converted_payloads[payload_key] = (
+                output_path,
+                relative_path,
+                success,
+                message,
+            )
+
+        if success:
+            converted_files.append(output_path)
+        else:
+            error_messages.append(f"Error in {relative_path}: {message}")
+
+        processed_files += 1
+        if progress_callback:
+            elapsed_time = time.time() - start_time
+            progress = processed_files / total_files
+            remaining_time = (
+                (elapsed_time / processed_files) * (total_files - processed_files)
+                if processed_files > 0
+                else 0
+            )
+            progress_callback(processed_files, total_files, progress, remaining_time)
+
+    return converted_files, error_messages, reused_files
+
+
+def display_progress(current, total, progress, remaining_time):
+    bar_length = 40
+    filled_length = int(bar_length * progress)
+    bar = "█" * filled_length + "-" * (bar_length - filled_length)
+
+    mins, secs = divmod(int(remaining_time), 60)
+    time_estimate = f"{mins:02d}:{secs:02d}" if remaining_time > 0 else "--:--"
+
+    sys.stdout.write(f"\rConverting: [{bar}] {current}/{total} ({progress:.1%})")
+    sys.stdout.write(f"\nETA: {time_estimate}\033")
+    sys.stdout.flush()
+
+
+def wait_for_key():
+    if os.name == "nt":
+        import msvcrt
+
+        print("\nPress any key to exit...")
+        msvcrt.getch()
+    else:
+        print("\nPress Enter to exit...")
+        try:
+            input()
+        except EOFError:
+            pass
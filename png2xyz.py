@@ -1,17 +1,25 @@
-﻿import io
-import os
+﻿import os
 import struct
 import sys
-import zlib
 import time
-import msvcrt
-from tkinter import Tk, filedialog
-from PIL import Image
+import zlib
+from converter_core import (
+    MAX_BAND_BYTES,
+    band_rows,
+    display_progress,
+    get_hardlink_choice,
+    get_user_choice,
+    iter_rgb_bands,
+    load_filedialog,
+    process_folder,
+    remap_band,
+    require_pillow,
+    set_window_title,
+    wait_for_key,
+)
 
 
-def set_window_title(title):
-    if os.name == "nt":
-        os.system(f"title {title}")
+BAND_BYTES_PER_PIXEL = 12
 
 
 def display_welcome():
@@ -32,61 +40,58 @@ def display_welcome():
     print("[Q] Quit\n")
 
 
-def get_user_choice():
-    while True:
-        choice = input("Your choice: ").strip().upper()
-        if choice in ["1", "2", "Q"]:
-            return choice
-        print("Invalid choice. Please enter 1, 2, or Q.")
-
+def convert_png_to_xyz(input_path, output_path, max_band_bytes=MAX_BAND_BYTES):
+    from PIL import Image
 
-def convert_png_to_xyz(input_path, output_path):
     try:
         with Image.open(input_path) as img:
-            if img.mode != "RGBA":
-                img = img.convert("RGBA")
-
             width, height = img.size
-            pixels = img.load()
+            rows = band_rows(width, height, BAND_BYTES_PER_PIXEL, max_band_bytes)
 
-            palette = {}
-            palette_index = 0
             palette_list = []
             color_to_index = {}
 
-            for y in range(height):
-                for x in range(width):
-                    color = pixels[x, y][:3]
-                    if color not in color_to_index:
-                        if len(palette_list) >= 256:
-                            return False, "Image has more than 256 colors"
-                        color_to_index[color] = palette_index
-                        palette_list.append(color)
-                        palette_index += 1
-
-            while len(palette_list) < 256:
-                palette_list.append((0, 0, 0))
+            for _, band in iter_rgb_bands(img, rows):
+                band_colors = band.getcolors(256)
+                if band_colors is None:
+                    return False, "Image has more than 256 colors"
 
-            output_data = io.BytesIO()
-            output_data.write(b"XYZ1")
-            output_data.write(struct.pack("=HH", width, height))
-
-            for color in palette_list:
-                output_data.write(struct.pack("=3B", *color))
-
-            for y in range(height):
-                for x in range(width):
-                    color = pixels[x, y][:3]
-                    output_data.write(bytes([color_to_index[color]]))
-
-            compressed_data = zlib.compress(output_data.getvalue()[8:])
+                new_colors = sum(
+                    1 for _, color in band_colors if bytes(color) not in color_to_index
+                )
+                if len(palette_list) + new_colors > 256:
+                    return False, "Image has more than 256 colors"
+
+                if new_colors:
+                    data = band.tobytes()
+                    for i in range(0, len(data), 3):
+                        color = data[i : i + 3]
+                        if color not in color_to_index:
+                            color_to_index[color] = len(palette_list)
+                            palette_list.append(color)
+                            new_colors -= 1
+                            if not new_colors:
+                                break
+                    del data
+                del band
+
+            palette_data = b"".join(palette_list)
+            palette_data += b"\x00" * (768 - len(palette_data))
 
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
+            compressor = zlib.compressobj()
             with open(output_path, "wb") as f:
                 f.write(b"XYZ1")
                 f.write(struct.pack("=HH", width, height))
-                f.write(compressed_data)
+                f.write(compressor.compress(palette_data))
+
+                for _, band in iter_rgb_bands(img, rows):
+                    indices = remap_band(band, color_to_index)
+                    f.write(compressor.compress(indices))
+                    del band, indices
+
+                f.write(compressor.flush())
 
             return True, None
 
@@ -94,79 +99,8 @@ def convert_png_to_xyz(input_path, output_path):
         return False, str(e)
 
 
-def process_folder(folder_path, output_root, progress_callback=None):
-    converted_files = []
-    error_messages = []
-
-    parent_folder_name = os.path.basename(os.path.normpath(folder_path))
-
-    total_files = 0
-    for root, _, files in os.walk(folder_path):
-        for file in files:
-            if file.lower().endswith(".png"):
-                total_files += 1
-
-    processed_files = 0
-    start_time = time.time()
-
-    for root, _, files in os.walk(folder_path):
-        for file in files:
-            if file.lower().endswith(".png"):
-                full_path = os.path.join(root, file)
-
-                relative_path = os.path.relpath(full_path, start=folder_path)
-                relative_dir = os.path.dirname(relative_path)
-
-                output_dir = os.path.join(output_root, parent_folder_name, relative_dir)
-                output_path = os.path.join(
-                    output_dir, os.path.splitext(file)[0] + ".xyz"
-                )
-
-                success, message = convert_png_to_xyz(full_path, output_path)
-                if success:
-                    converted_files.append(output_path)
-                else:
-                    error_messages.append(f"Error in {relative_path}: {message}")
-
-                processed_files += 1
-                if progress_callback:
-                    elapsed_time = time.time() - start_time
-                    progress = processed_files / total_files
-                    remaining_time = (
-                        (elapsed_time / processed_files)
-                        * (total_files - processed_files)
-                        if processed_files > 0
-                        else 0
-                    )
-                    progress_callback(
-                        processed_files, total_files, progress, remaining_time
-                    )
-
-    return converted_files, error_messages
-
-
-def display_progress(current, total, progress, remaining_time):
-    bar_length = 40
-    filled_length = int(bar_length * progress)
-    bar = "█" * filled_length + "-" * (bar_length - filled_length)
-
-    mins, secs = divmod(int(remaining_time), 60)
-    time_estimate = f"{mins:02d}:{secs:02d}" if remaining_time > 0 else "--:--"
-
-    sys.stdout.write(f"\rConverting: [{bar}] {current}/{total} ({progress:.1%})")
-    sys.stdout.write(f"\nETA: {time_estimate}\033")
-    sys.stdout.flush()
-
-
-def wait_for_key():
-    print("\nPress any key to exit...")
-    msvcrt.getch()
-
-
 def main():
     set_window_title("PNG2XYZ Converter - Made by Rafaelmorai")
-    root = Tk()
-    root.withdraw()
 
     output_root = os.path.join(os.path.expanduser("~"), "Downloads", "PNG2XYZ_Output")
 
@@ -177,7 +111,10 @@ def main():
         print("\nGoodbye!")
         return
 
+    filedialog = load_filedialog()
+
     total_converted = 0
+    total_reused = 0
     all_error_messages = []
 
     if choice == "1":
@@ -226,16 +163,32 @@ def main():
             print("\nNo folder selected. Exiting.")
             return
 
+        use_hardlinks = get_hardlink_choice()
+
         print(f"\nProcessing folder: {current_folder}")
-        converted, errors = process_folder(
-            current_folder, output_root, display_progress
+        converted, errors, reused = process_folder(
+            current_folder,
+            output_root,
+            ".png",
+            ".xyz",
+            convert_png_to_xyz,
+            display_progress,
+            use_hardlinks,
         )
         total_converted += len(converted)
+        total_reused += reused
         all_error_messages.extend(errors)
         print("\n")
 
     summary = f"Conversion complete!\n\nTotal files converted: {total_converted}"
 
+    if total_reused:
+        summary += (
+            f"\nDuplicate files reused: {total_reused} "
+            f"({total_reused / (total_converted + len(all_error_messages)):.1%} "
+            "of conversions skipped)"
+        )
+
     if all_error_messages:
         summary += f"\n\nErrors encountered ({len(all_error_messages)}):\n" + "\n".join(
             all_error_messages[:5]
@@ -249,13 +202,7 @@ def main():
 
 
 if __name__ == "__main__":
-    try:
-        from PIL import Image
-    except ImportError:
-        print("Error: PIL (Pillow) module not installed. Please install it with:")
-        print("pip install -r requirements.txt")
-        wait_for_key()
-        sys.exit(1)
+    require_pillow("pip install -r requirements.txt")
 
     try:
         main()
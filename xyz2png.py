@@ -1,17 +1,24 @@
-import io
 import os
 import struct
 import sys
-import zlib
 import time
-import msvcrt
-from tkinter import Tk, filedialog
-from PIL import Image
+import zlib
+from converter_core import (
+    MAX_BAND_BYTES,
+    band_rows,
+    display_progress,
+    get_hardlink_choice,
+    get_user_choice,
+    load_filedialog,
+    process_folder,
+    set_window_title,
+    wait_for_key,
+)
 
 
-def set_window_title(title):
-    if os.name == "nt":
-        os.system(f"title {title}")
+BAND_BYTES_PER_PIXEL = 3
+READ_CHUNK_SIZE = 1024 * 1024
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
 
 
 def display_welcome():
@@ -32,15 +39,27 @@ def display_welcome():
     print("[Q] Quit\n")
 
 
-def get_user_choice():
-    while True:
-        choice = input("Your choice: ").strip().upper()
-        if choice in ["1", "2", "Q"]:
-            return choice
-        print("Invalid choice. Please enter 1, 2, or Q.")
+def read_decompressed(input_fh, decompressor, size):
+    data = bytearray()
+    while len(data) < size:
+        compressed = decompressor.unconsumed_tail
+        if not compressed:
+            compressed = input_fh.read(READ_CHUNK_SIZE)
+            if not compressed:
+                raise ValueError("Unexpected end of XYZ image data")
+        data += decompressor.decompress(compressed, size - len(data))
+    return data
+
 
+def write_png_chunk(output_fh, chunk_type, data):
+    output_fh.write(struct.pack(">I", len(data)))
+    output_fh.write(chunk_type)
+    output_fh.write(data)
+    output_fh.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type))))
 
-def convert_xyz_to_png(input_path, output_path):
+
+def convert_xyz_to_png(input_path, output_path, max_band_bytes=MAX_BAND_BYTES):
+    partial_path = output_path + ".part"
     try:
         with open(input_path, "rb") as input_fh:
             magic = input_fh.read(4)
@@ -48,104 +67,53 @@ def convert_xyz_to_png(input_path, output_path):
                 return False, f"Unsupported file format: {magic}"
 
             width, height = struct.unpack("=HH", input_fh.read(4))
-            rest = input_fh.read()
-            rest = zlib.decompress(rest)
-            rest = io.BytesIO(rest)
-
-            palette = []
-            for x in range(256):
-                r, g, b = struct.unpack("=3B", rest.read(3))
-                palette.append((r, g, b))
+            if not width or not height:
+                return False, "Image has no pixels"
 
-            output_image = Image.new("RGBA", (width, height))
-            output_pixels = output_image.load()
-
-            for y in range(height):
-                for x in range(width):
-                    output_pixels[x, y] = palette[ord(rest.read(1))]
+            decompressor = zlib.decompressobj()
+            palette_data = read_decompressed(input_fh, decompressor, 768)
+            rows = band_rows(width, height, BAND_BYTES_PER_PIXEL, max_band_bytes)
 
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-            output_image.save(output_path)
+            header = struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)
+            compressor = zlib.compressobj()
+            with open(partial_path, "wb") as output_fh:
+                output_fh.write(PNG_SIGNATURE)
+                write_png_chunk(output_fh, b"IHDR", header)
+                write_png_chunk(output_fh, b"PLTE", bytes(palette_data))
+
+                for top in range(0, height, rows):
+                    band_height = min(rows, height - top)
+                    band_data = read_decompressed(
+                        input_fh, decompressor, width * band_height
+                    )
+                    band_view = memoryview(band_data)
+                    scanlines = bytearray()
+                    for offset in range(0, len(band_data), width):
+                        scanlines += b"\x00"
+                        scanlines += band_view[offset : offset + width]
+                    del band_view, band_data
+
+                    compressed = compressor.compress(scanlines)
+                    if compressed:
+                        write_png_chunk(output_fh, b"IDAT", compressed)
+                    del scanlines, compressed
+
+                write_png_chunk(output_fh, b"IDAT", compressor.flush())
+                write_png_chunk(output_fh, b"IEND", b"")
+
+            os.replace(partial_path, output_path)
             return True, None
 
     except Exception as e:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
         return False, str(e)
 
 
-def process_folder(folder_path, output_root, progress_callback=None):
-    converted_files = []
-    error_messages = []
-
-    parent_folder_name = os.path.basename(os.path.normpath(folder_path))
-
-    total_files = 0
-    for root, _, files in os.walk(folder_path):
-        for file in files:
-            if file.lower().endswith(".xyz"):
-                total_files += 1
-
-    processed_files = 0
-    start_time = time.time()
-
-    for root, _, files in os.walk(folder_path):
-        for file in files:
-            if file.lower().endswith(".xyz"):
-                full_path = os.path.join(root, file)
-
-                relative_path = os.path.relpath(full_path, start=folder_path)
-                relative_dir = os.path.dirname(relative_path)
-
-                output_dir = os.path.join(output_root, parent_folder_name, relative_dir)
-                output_path = os.path.join(
-                    output_dir, os.path.splitext(file)[0] + ".png"
-                )
-
-                success, message = convert_xyz_to_png(full_path, output_path)
-                if success:
-                    converted_files.append(output_path)
-                else:
-                    error_messages.append(f"Error in {relative_path}: {message}")
-
-                processed_files += 1
-                if progress_callback:
-                    elapsed_time = time.time() - start_time
-                    progress = processed_files / total_files
-                    remaining_time = (
-                        (elapsed_time / processed_files)
-                        * (total_files - processed_files)
-                        if processed_files > 0
-                        else 0
-                    )
-                    progress_callback(
-                        processed_files, total_files, progress, remaining_time
-                    )
-
-    return converted_files, error_messages
-
-
-def display_progress(current, total, progress, remaining_time):
-    bar_length = 40
-    filled_length = int(bar_length * progress)
-    bar = "█" * filled_length + "-" * (bar_length - filled_length)
-
-    mins, secs = divmod(int(remaining_time), 60)
-    time_estimate = f"{mins:02d}:{secs:02d}" if remaining_time > 0 else "--:--"
-
-    sys.stdout.write(f"\rConverting: [{bar}] {current}/{total} ({progress:.1%})")
-    sys.stdout.write(f"\nETA: {time_estimate}\033")
-    sys.stdout.flush()
-
-
-def wait_for_key():
-    print("\nPress any key to exit...")
-    msvcrt.getch()
-
-
 def main():
     set_window_title("XYZ2PNG Converter - Made by Rafaelmorai")
-    root = Tk()
-    root.withdraw()
 
     output_root = os.path.join(os.path.expanduser("~"), "Downloads", "XYZ2PNG_Output")
 
@@ -156,7 +124,10 @@ def main():
         print("\nGoodbye!")
         return
 
+    filedialog = load_filedialog()
+
     total_converted = 0
+    total_reused = 0
     all_error_messages = []
 
     if choice == "1":
@@ -205,16 +176,32 @@ def main():
             print("\nNo folder selected. Exiting.")
             return
 
+        use_hardlinks = get_hardlink_choice()
+
         print(f"\nProcessing folder: {current_folder}")
-        converted, errors = process_folder(
-            current_folder, output_root, display_progress
+        converted, errors, reused = process_folder(
+            current_folder,
+            output_root,
+            ".xyz",
+            ".png",
+            convert_xyz_to_png,
+            display_progress,
+            use_hardlinks,
         )
         total_converted += len(converted)
+        total_reused += reused
         all_error_messages.extend(errors)
         print("\n")
 
     summary = f"Conversion complete!\n\nTotal files converted: {total_converted}"
 
+    if total_reused:
+        summary += (
+            f"\nDuplicate files reused: {total_reused} "
+            f"({total_reused / (total_converted + len(all_error_messages)):.1%} "
+            "of conversions skipped)"
+        )
+
     if all_error_messages:
         summary += f"\n\nErrors encountered ({len(all_error_messages)}):\n" + "\n".join(
             all_error_messages[:5]
@@ -228,14 +215,6 @@ def main():
 
 
 if __name__ == "__main__":
-    try:
-        from PIL import Image
-    except ImportError:
-        print("Error: PIL (Pillow) module not installed. Please install it with:")
-        print("pip install -r requirements.txt")
-        wait_for_key()
-        sys.exit(1)
-
     try:
         main()
     except KeyboardInterrupt: